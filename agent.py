@@ -1,24 +1,188 @@
 """
 Main Conversational AI Agent using LangGraph with state management.
 """
-from typing import TypedDict, Annotated, List
-from langchain_openai import ChatOpenAI
+import asyncio
+import atexit
+import hashlib
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import TypedDict, Annotated, Iterator, List, Optional
+import numpy as np
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, SystemMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 
+from openai_clients import get_chat_model
 from rag_pipeline import RAGPipeline
-from intent_detector import IntentDetector, Intent
+from semantic_cache import SemanticCache, normalize
+from intent_detector import IntentDetector, Intent, classify_by_rules
 from lead_capture import mock_lead_capture, validate_email, extract_info_from_message
 
 
+# Number of recent messages passed to the intent detector as context
+HISTORY_WINDOW = 6
+
+GREETING_SYSTEM_PROMPT = """You are a friendly AI assistant for AutoStream, an automated video editing platform for content creators. 
+Respond warmly to greetings and offer to help with information about AutoStream's pricing, features, or plans."""
+
+# Formatted with the retrieved knowledge base context
+INQUIRY_SYSTEM_PROMPT = """You are a helpful AI assistant for AutoStream, an automated video editing platform for content creators.
+
+Use the following knowledge base information to answer user questions accurately:
+
+{context}
+
+Answer questions clearly and concisely. If asked about pricing, provide specific details about both plans. If asked about features, be specific about what each plan includes."""
+
+# Replies asking for the lead fields that are still missing
+MISSING_LEAD_INFO_PROMPTS = {
+    frozenset({"name", "email", "platform"}): "Great! I'd love to help you get started with AutoStream. To proceed, I'll need a few details:\n\n1. What's your name?\n2. What's your email address?\n3. Which platform do you create content on? (YouTube, Instagram, TikTok, etc.)",
+    frozenset({"name", "email"}): "I'd like to collect your name and email address to proceed.",
+    frozenset({"name", "platform"}): "I'd like to know your name and which platform you create content on.",
+    frozenset({"email", "platform"}): "I'd like to collect your email and which platform you create content on.",
+    frozenset({"name"}): "What's your name?",
+    frozenset({"email"}): "What's your email address?",
+    frozenset({"platform"}): "Which platform do you create content on? (YouTube, Instagram, TikTok, etc.)",
+    frozenset(): "Thank you! I have all the information I need."
+}
+
+CONFIRMATION_TEMPLATE = "Perfect! I've captured your information:\n- Name: {name}\n- Email: {email}\n- Platform: {platform}\n\nOur team will reach out to you shortly to help you get started with AutoStream!"
+
+# Representative phrases whose mean embedding is each intent's centroid
+INTENT_EXAMPLES = {
+    Intent.GREETING.value: [
+        "Hi",
+        "Hello there!",
+        "Hey, how are you?",
+        "Good morning"
+    ],
+    Intent.PRODUCT_INQUIRY.value: [
+        "How much does AutoStream cost?",
+        "What features are included in the Pro plan?",
+        "What is your refund policy?",
+        "Do you offer customer support?"
+    ],
+    Intent.HIGH_INTENT_LEAD.value: [
+        "I want to sign up for the Pro plan",
+        "I'd like to try AutoStream for my YouTube channel",
+        "I'm ready to buy, how do I get started?",
+        "Sign me up, I create content on Instagram"
+    ]
+}
+
+# Minimum gap between the two closest intent centroids to trust the embedding
+# classification; closer calls fall back to the LLM intent detector
+INTENT_MARGIN = 0.04
+
+# Graph nodes whose LLM tokens are part of the reply streamed to the user
+STREAMED_NODES = frozenset({"handle_greeting", "handle_inquiry"})
+
+# Likely follow-up questions answered speculatively after an inquiry turn
+FOLLOWUP_QUERIES = [
+    "What's the difference between the Basic and Pro plans?",
+    "Can I upgrade from the Basic plan to the Pro plan later?",
+    "How many videos can I edit on the Basic plan?",
+    "Does the Pro plan support 4K exports?",
+    "Which platforms does AutoStream work with?",
+    "How do AI captions work?"
+]
+
+# Follow-ups prefetched per turn, and how many prefetch LLM calls may run at once
+PREFETCH_TOP_K = 2
+PREFETCH_CONCURRENCY = 2
+
+# File in the RAG cache directory that keeps generated responses across runs, named
+# after the chat model and a digest of the system prompts the responses were generated with
+RESPONSE_CACHE_FILE = "response_cache_{model}_{digest}.npz"
+
+# Newest responses kept when the response cache is saved
+RESPONSE_CACHE_MAX_ENTRIES = 2000
+
+# Intent centroids saved in the RAG cache directory, named after a digest of INTENT_EXAMPLES
+INTENT_CENTROIDS_FILE = "intent_centroids_{digest}.npy"
+
+# Unit embeddings of the FAQ questions, saved next to the RAG pipeline's FAQ file and
+# named after a digest of the questions
+FAQ_VECTORS_FILE = "faq_vectors_{digest}.npy"
+
+# Number of normalized queries whose retrieved context is kept for exact reuse
+CONTEXT_CACHE_SIZE = 512
+
+# Bits of state["lead_flags"], set as each lead field is collected
+LEAD_FLAG_NAME = 0b001
+LEAD_FLAG_EMAIL_VALID = 0b010
+LEAD_FLAG_PLATFORM = 0b100
+LEAD_FLAGS_COMPLETE = LEAD_FLAG_NAME | LEAD_FLAG_EMAIL_VALID | LEAD_FLAG_PLATFORM
+
+
 class AgentState(TypedDict):
     """State management for the agent."""
     messages: Annotated[List, add_messages]
     intent: str
     lead_info: dict  # Stores name, email, platform as they're collected
+    lead_flags: int  # LEAD_FLAG_* bits of the lead fields collected so far
     conversation_turn: int
+    history_buf: deque  # Formatted "User: ..." / "Agent: ..." lines of the last HISTORY_WINDOW messages
+    query_vector: Optional[np.ndarray]  # Unit-length embedding of the current user message, shared by the nodes
+    context: Optional[str]  # Knowledge base context retrieved ahead of the inquiry handler
+
+
+def _agent_node(method_name: str, async_method_name: Optional[str] = None):
+    """
+    Graph node that runs the named method of the agent passed in the run config.
+    
+    Args:
+        method_name: Agent method run by invoke() and stream()
+        async_method_name: Coroutine method run by ainvoke() instead, if any
+        
+    Returns:
+        Node callable, or a runnable with both sync and async paths
+    """
+    def node(state: AgentState, config: RunnableConfig) -> AgentState:
+        return getattr(config["configurable"]["agent"], method_name)(state)
+    node.__name__ = method_name
+    if async_method_name is None:
+        return node
+    
+    async def anode(state: AgentState, config: RunnableConfig) -> AgentState:
+        return await getattr(config["configurable"]["agent"], async_method_name)(state)
+    return RunnableLambda(node, afunc=anode, name=method_name)
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop):
+    """Run an event loop in the current thread until it is stopped, then close it."""
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_forever()
+    finally:
+        loop.close()
+
+
+@lru_cache(maxsize=None)
+def _shared_response_cache(path: str) -> SemanticCache:
+    """
+    Response cache saved at `path`, loaded once per process and shared by every agent using it.
+    
+    A single exit hook writes it back, so agents do not overwrite each other's entries.
+    
+    Args:
+        path: Absolute path of the saved cache
+        
+    Returns:
+        Process-wide semantic cache of generated responses
+    """
+    # The caches are only given unit vectors, so they skip normalizing them
+    cache = SemanticCache(threshold=0.95, prenormalized=True)
+    if os.path.exists(path):
+        cache.load(path)
+    atexit.register(cache.save, path, RESPONSE_CACHE_MAX_ENTRIES)
+    return cache
 
 
 class ConversationalAgent:
@@ -34,35 +198,178 @@ class ConversationalAgent:
         """
         # Ensure API key is available - use environment variable if not provided
         if api_key is None:
-            import os
             api_key = os.getenv("OPENAI_API_KEY")
         
         if not api_key:
             raise ValueError("OpenAI API key must be provided either as parameter or OPENAI_API_KEY environment variable")
         
-        self.llm = ChatOpenAI(
-            model=model,
-            temperature=0.7,
-            api_key=api_key
-        )
+        self.llm = get_chat_model(api_key, model, 0.7)
+        
+        self._greeting_prompt = ChatPromptTemplate.from_messages([
+            ("system", GREETING_SYSTEM_PROMPT),
+            MessagesPlaceholder(variable_name="messages")
+        ])
         
         self.rag = RAGPipeline(api_key=api_key)
+        self.embeddings = self.rag.embeddings
+        # Responses depend on the chat model and prompts as well as the knowledge base
+        prompts_digest = hashlib.sha256(
+            repr((model, GREETING_SYSTEM_PROMPT, INQUIRY_SYSTEM_PROMPT)).encode()
+        ).hexdigest()[:16]
+        response_cache_file = RESPONSE_CACHE_FILE.format(
+            model=re.sub(r"[^\w.-]", "_", model), digest=prompts_digest
+        )
+        self._response_cache_path = os.path.abspath(os.path.join(self.rag.cache_dir, response_cache_file))
+        self.response_cache = _shared_response_cache(self._response_cache_path)
+        self.context_cache = SemanticCache(threshold=0.93, prenormalized=True)
+        self.faq_cache = SemanticCache(threshold=0.9, prenormalized=True)
+        self._context_lru = OrderedDict()  # Normalized query -> retrieved context
+        self._context_lock = threading.Lock()
+        self._followup_vectors = None  # Embedded lazily by the first prefetch
+        self._prefetch_loop = None
+        self._prefetch_semaphore = None
+        self._prefetch_tasks = set()  # Keeps background prefetch tasks referenced
+        self._batch_loop = None  # Event loop thread shared by chat_batch() calls, started on first use
+        self._batch_loop_lock = threading.Lock()
         self.intent_detector = IntentDetector(api_key=api_key, model=model)
+        self._init_intent_centroids()
+        self._init_faq()
         
         # Build the graph
-        self.graph = self._build_graph()
-        self.app = self.graph.compile()
+        self.app = self._compiled_graph()
+        self.graph = self.app.builder
+        self._run_config = {"configurable": {"agent": self}}
+    
+    def save_response_cache(self):
+        """Persist the shared response cache now instead of waiting for interpreter exit."""
+        self.response_cache.save(self._response_cache_path, RESPONSE_CACHE_MAX_ENTRIES)
     
-    def _build_graph(self) -> StateGraph:
+    def _init_intent_centroids(self):
+        """Embed the intent examples and average them into unit centroid vectors."""
+        self._intent_labels = list(INTENT_EXAMPLES)
+        
+        # The embedding model is already part of the cache directory digest
+        digest = hashlib.sha256(repr(INTENT_EXAMPLES).encode()).hexdigest()[:16]
+        centroids_path = os.path.join(self.rag.cache_dir, INTENT_CENTROIDS_FILE.format(digest=digest))
+        if os.path.exists(centroids_path):
+            self._intent_centroids = np.load(centroids_path)
+            return
+        
+        examples = [phrase for label in self._intent_labels for phrase in INTENT_EXAMPLES[label]]
+        vectors = np.asarray(self.embeddings.embed_documents(examples), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+        centroids = []
+        start = 0
+        for label in self._intent_labels:
+            end = start + len(INTENT_EXAMPLES[label])
+            centroids.append(vectors[start:end].mean(axis=0))
+            start = end
+        centroids = np.vstack(centroids)
+        self._intent_centroids = centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+        np.save(centroids_path, self._intent_centroids)
+    
+    def _init_faq(self):
+        """Index the knowledge base FAQ answers by the embedding of their question."""
+        entries = self.rag.faq_entries()
+        questions = [question for question, _ in entries]
+        digest = hashlib.sha256(repr(questions).encode()).hexdigest()[:16]
+        vectors_path = os.path.join(self.rag.cache_dir, FAQ_VECTORS_FILE.format(digest=digest))
+        if os.path.exists(vectors_path):
+            vectors = np.load(vectors_path)
+        else:
+            vectors = np.asarray(self.embeddings.embed_documents(questions), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            np.save(vectors_path, vectors)
+        for vector, (_, answer) in zip(vectors, entries):
+            self.faq_cache.add(vector, answer)
+    
+    def _classify_by_embedding(self, query_vector: np.ndarray) -> Optional[str]:
+        """
+        Classify intent by cosine similarity to the intent centroids.
+        
+        Args:
+            query_vector: Unit-length embedding of the user message
+            
+        Returns:
+            Intent value, or None if the two best intents are too close to call
+        """
+        scores = self._intent_centroids @ query_vector
+        second, best = np.argsort(scores)[-2:]
+        if scores[best] - scores[second] < INTENT_MARGIN:
+            return None
+        return self._intent_labels[best]
+    
+    def _query_vector(self, state: AgentState, user_query: str) -> np.ndarray:
+        """Get the unit-length embedding of the current user message, computing it if needed."""
+        if state.get("query_vector") is None:
+            # Normalized once here; the intent centroids, caches and retrieval all reuse it
+            state["query_vector"] = normalize(self.embeddings.embed_query(user_query))
+        return state["query_vector"]
+    
+    def _get_context(self, user_query: str, query_vector: np.ndarray) -> str:
+        """
+        Retrieve knowledge base context, reusing results for repeated or similar queries.
+        
+        Args:
+            user_query: User query
+            query_vector: Unit-length embedding of the query
+            
+        Returns:
+            Formatted context string
+        """
+        key = " ".join(user_query.lower().split())
+        context = self._cached_context(key, query_vector)
+        if context is None:
+            context = self.rag.get_context(user_query, query_vector=query_vector)
+            self.context_cache.add(query_vector, context)
+        self._remember_context(key, context)
+        return context
+    
+    async def _aget_context(self, user_query: str, query_vector: np.ndarray) -> str:
+        """Async version of _get_context()."""
+        key = " ".join(user_query.lower().split())
+        context = self._cached_context(key, query_vector)
+        if context is None:
+            context = await self.rag.aget_context(user_query, query_vector=query_vector)
+            self.context_cache.add(query_vector, context)
+        self._remember_context(key, context)
+        return context
+    
+    def _cached_context(self, key: str, query_vector: np.ndarray) -> Optional[str]:
+        """Look up context by exact normalized query, then by similar query."""
+        with self._context_lock:
+            context = self._context_lru.get(key)
+            if context is not None:
+                self._context_lru.move_to_end(key)
+                return context
+        return self.context_cache.lookup(query_vector)
+    
+    def _remember_context(self, key: str, context: str):
+        """Keep context for exact reuse, evicting the least recently used entry."""
+        with self._context_lock:
+            self._context_lru[key] = context
+            self._context_lru.move_to_end(key)
+            if len(self._context_lru) > CONTEXT_CACHE_SIZE:
+                self._context_lru.popitem(last=False)
+    
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _compiled_graph(cls):
+        """Compile the graph once per class; every agent instance shares it."""
+        return cls._build_graph().compile()
+    
+    @classmethod
+    def _build_graph(cls) -> StateGraph:
         """Build the LangGraph state graph."""
         workflow = StateGraph(AgentState)
         
-        # Add nodes
-        workflow.add_node("process_message", self._process_message)
-        workflow.add_node("handle_greeting", self._handle_greeting)
-        workflow.add_node("handle_inquiry", self._handle_inquiry)
-        workflow.add_node("handle_lead", self._handle_lead)
-        workflow.add_node("collect_lead_info", self._collect_lead_info)
+        # Add nodes (each dispatches to the agent in the run config)
+        workflow.add_node("process_message", _agent_node("_process_message", "_aprocess_message"))
+        workflow.add_node("handle_greeting", _agent_node("_handle_greeting"))
+        workflow.add_node("handle_inquiry", _agent_node("_handle_inquiry"))
+        workflow.add_node("handle_lead", _agent_node("_handle_lead"))
+        workflow.add_node("collect_lead_info", _agent_node("_collect_lead_info"))
         
         # Set entry point
         workflow.set_entry_point("process_message")
@@ -70,7 +377,7 @@ class ConversationalAgent:
         # Add conditional edges
         workflow.add_conditional_edges(
             "process_message",
-            self._route_intent,
+            cls._route_intent,
             {
                 "greeting": "handle_greeting",
                 "product_inquiry": "handle_inquiry",
@@ -80,7 +387,7 @@ class ConversationalAgent:
         
         workflow.add_conditional_edges(
             "handle_lead",
-            self._check_lead_info_complete,
+            cls._check_lead_info_complete,
             {
                 "complete": "collect_lead_info",
                 "incomplete": END
@@ -96,52 +403,98 @@ class ConversationalAgent:
     
     def _process_message(self, state: AgentState) -> AgentState:
         """Process incoming message and detect intent."""
-        messages = state["messages"]
-        last_message = messages[-1]
+        user_message, history = self._record_user_message(state)
+        intent = self._quick_intent(state, user_message)
+        if intent is None:
+            # Embed the message once; the vector also serves the cache and retrieval
+            query_vector = self._query_vector(state, user_message)
+            intent = self._classify_by_embedding(query_vector)
+            if intent is None:
+                intent = self.intent_detector.detect(user_message, history)
+        state["intent"] = intent
+        
+        state["conversation_turn"] = state.get("conversation_turn", 0) + 1
+        
+        return state
+    
+    async def _aprocess_message(self, state: AgentState) -> AgentState:
+        """Async version of _process_message() that retrieves context while the LLM classifies."""
+        user_message, history = self._record_user_message(state)
+        intent = self._quick_intent(state, user_message)
+        if intent is None:
+            query_vector = normalize(await self.embeddings.aembed_query(user_message))
+            state["query_vector"] = query_vector
+            intent = self._classify_by_embedding(query_vector)
+            if intent is None:
+                # Retrieval does not depend on the intent; the inquiry handler reuses it
+                intent, state["context"] = await asyncio.gather(
+                    self.intent_detector.adetect(user_message, history),
+                    self._aget_context(user_message, query_vector)
+                )
+        state["intent"] = intent
+        
+        state["conversation_turn"] = state.get("conversation_turn", 0) + 1
+        
+        return state
+    
+    def _record_user_message(self, state: AgentState) -> tuple[str, str]:
+        """
+        Add the current user message to the history buffer.
+        
+        Args:
+            state: Agent state whose last message is the user message
+            
+        Returns:
+            Tuple of (user_message, history before the message)
+        """
+        last_message = state["messages"][-1]
         
-        # Get conversation history for context
-        history = self._format_conversation_history(messages[:-1])
+        # Get conversation history for context, then record the current message
+        history = self._format_conversation_history(state)
         user_message = last_message.content if hasattr(last_message, 'content') else str(last_message)
+        state["history_buf"].append(f"User: {user_message}")
         
+        # Per-turn values are recomputed for the new message
+        state["query_vector"] = None
+        state["context"] = None
+        return user_message, history
+    
+    def _quick_intent(self, state: AgentState, user_message: str) -> Optional[str]:
+        """Intent that needs no model call: an unfinished lead or a rule match, if any."""
         # Check if we're already collecting lead info
-        lead_info = state.get("lead_info", {})
-        is_collecting_lead = bool(lead_info) and not (
-            "name" in lead_info and lead_info.get("name") and
-            "email" in lead_info and lead_info.get("email") and validate_email(lead_info.get("email", "")) and
-            "platform" in lead_info and lead_info.get("platform")
-        )
+        is_collecting_lead = bool(state["lead_info"]) and state["lead_flags"] != LEAD_FLAGS_COMPLETE
         
         # If we're collecting lead info, route to lead handler regardless of detected intent
         if is_collecting_lead:
-            state["intent"] = "high_intent_lead"
-        else:
-            # Detect intent
-            intent = self.intent_detector.detect(user_message, history)
-            state["intent"] = intent.value
+            return "high_intent_lead"
         
-        state["conversation_turn"] = state.get("conversation_turn", 0) + 1
-        
-        return state
+        # Unambiguous messages skip both the embedding and the LLM
+        return classify_by_rules(user_message)
     
-    def _route_intent(self, state: AgentState) -> str:
+    @staticmethod
+    def _route_intent(state: AgentState) -> str:
         """Route to appropriate handler based on intent."""
         return state["intent"]
     
     def _handle_greeting(self, state: AgentState) -> AgentState:
         """Handle greeting messages."""
-        system_prompt = """You are a friendly AI assistant for AutoStream, an automated video editing platform for content creators. 
-Respond warmly to greetings and offer to help with information about AutoStream's pricing, features, or plans."""
-        
         messages = state["messages"]
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            MessagesPlaceholder(variable_name="messages")
-        ])
+        last_message = messages[-1]
+        user_query = last_message.content if hasattr(last_message, 'content') else str(last_message)
+        
+        # Reuse the answer to a semantically similar earlier query
+        query_vector = self._query_vector(state, user_query)
+        cached_response = self.response_cache.lookup(query_vector)
+        if cached_response is not None:
+            self._add_ai_message(state, cached_response)
+            return state
         
-        formatted_prompt = prompt.format_messages(messages=messages)
-        response = self.llm.invoke(formatted_prompt)
+        formatted_prompt = self._greeting_prompt.format_messages(messages=messages)
+        # Stream so chat_stream() can forward tokens as they arrive
+        response_text = "".join(chunk.content for chunk in self.llm.stream(formatted_prompt))
+        self.response_cache.add(query_vector, response_text)
         
-        state["messages"].append(AIMessage(content=response.content))
+        self._add_ai_message(state, response_text)
         return state
     
     def _handle_inquiry(self, state: AgentState) -> AgentState:
@@ -150,26 +503,27 @@ Respond warmly to greetings and offer to help with information about AutoStream'
         last_message = messages[-1]
         user_query = last_message.content if hasattr(last_message, 'content') else str(last_message)
         
-        # Retrieve relevant context from knowledge base
-        context = self.rag.get_context(user_query)
-        
-        system_prompt = f"""You are a helpful AI assistant for AutoStream, an automated video editing platform for content creators.
-
-Use the following knowledge base information to answer user questions accurately:
-
-{context}
-
-Answer questions clearly and concisely. If asked about pricing, provide specific details about both plans. If asked about features, be specific about what each plan includes."""
+        # Answer common questions from the FAQ, then reuse answers to similar
+        # earlier queries, before falling back to RAG + LLM
+        query_vector = self._query_vector(state, user_query)
+        cached_response = self.faq_cache.lookup(query_vector)
+        if cached_response is None:
+            cached_response = self.response_cache.lookup(query_vector)
+        if cached_response is not None:
+            self._add_ai_message(state, cached_response)
+            return state
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            MessagesPlaceholder(variable_name="messages")
-        ])
+        # Retrieve relevant context from knowledge base, unless it was fetched alongside intent detection
+        context = state.get("context")
+        if context is None:
+            context = self._get_context(user_query, query_vector)
         
-        formatted_prompt = prompt.format_messages(messages=messages)
-        response = self.llm.invoke(formatted_prompt)
+        formatted_prompt = [SystemMessage(content=INQUIRY_SYSTEM_PROMPT.format(context=context))] + messages
+        # Stream so chat_stream() can forward tokens as they arrive
+        response_text = "".join(chunk.content for chunk in self.llm.stream(formatted_prompt))
+        self.response_cache.add(query_vector, response_text)
         
-        state["messages"].append(AIMessage(content=response.content))
+        self._add_ai_message(state, response_text)
         return state
     
     def _handle_lead(self, state: AgentState) -> AgentState:
@@ -178,10 +532,6 @@ Answer questions clearly and concisely. If asked about pricing, provide specific
         last_message = messages[-1]
         user_message = last_message.content if hasattr(last_message, 'content') else str(last_message)
         
-        # Initialize lead_info if not present
-        if "lead_info" not in state:
-            state["lead_info"] = {}
-        
         lead_info = state["lead_info"]
         
         # Try to extract information from the message
@@ -192,49 +542,31 @@ Answer questions clearly and concisely. If asked about pricing, provide specific
             lead_info["email"] = extracted["email"]
         if "platform" in extracted and "platform" not in lead_info:
             lead_info["platform"] = extracted["platform"]
+        state["lead_flags"] = self._lead_flags(lead_info)
         
-        # Determine what's missing
-        missing = []
-        if "name" not in lead_info:
-            missing.append("name")
-        if "email" not in lead_info:
-            missing.append("email")
-        if "platform" not in lead_info:
-            missing.append("platform (e.g., YouTube, Instagram)")
-        
-        if missing:
-            # Ask for missing information
-            if len(missing) == 3:
-                response_text = "Great! I'd love to help you get started with AutoStream. To proceed, I'll need a few details:\n\n1. What's your name?\n2. What's your email address?\n3. Which platform do you create content on? (YouTube, Instagram, TikTok, etc.)"
-            elif len(missing) == 2:
-                if "name" in missing and "email" in missing:
-                    response_text = "I'd like to collect your name and email address to proceed."
-                elif "name" in missing and "platform" in missing:
-                    response_text = "I'd like to know your name and which platform you create content on."
-                else:
-                    response_text = "I'd like to collect your email and which platform you create content on."
-            else:
-                if "name" in missing:
-                    response_text = "What's your name?"
-                elif "email" in missing:
-                    response_text = "What's your email address?"
-                else:
-                    response_text = "Which platform do you create content on? (YouTube, Instagram, TikTok, etc.)"
-        else:
-            response_text = "Thank you! I have all the information I need."
+        # Ask for whatever is still missing
+        missing = frozenset(field for field in ("name", "email", "platform") if field not in lead_info)
+        response_text = MISSING_LEAD_INFO_PROMPTS[missing]
         
-        state["messages"].append(AIMessage(content=response_text))
+        self._add_ai_message(state, response_text)
         return state
     
-    def _check_lead_info_complete(self, state: AgentState) -> str:
+    @staticmethod
+    def _lead_flags(lead_info: dict) -> int:
+        """Compute the LEAD_FLAG_* bits of the collected lead information."""
+        flags = 0
+        if lead_info.get("name"):
+            flags |= LEAD_FLAG_NAME
+        if lead_info.get("email") and validate_email(lead_info["email"]):
+            flags |= LEAD_FLAG_EMAIL_VALID
+        if lead_info.get("platform"):
+            flags |= LEAD_FLAG_PLATFORM
+        return flags
+    
+    @staticmethod
+    def _check_lead_info_complete(state: AgentState) -> str:
         """Check if all lead information has been collected."""
-        lead_info = state.get("lead_info", {})
-        
-        has_name = "name" in lead_info and lead_info["name"]
-        has_email = "email" in lead_info and lead_info["email"] and validate_email(lead_info["email"])
-        has_platform = "platform" in lead_info and lead_info["platform"]
-        
-        if has_name and has_email and has_platform:
+        if state["lead_flags"] == LEAD_FLAGS_COMPLETE:
             return "complete"
         return "incomplete"
     
@@ -247,30 +579,76 @@ Answer questions clearly and concisely. If asked about pricing, provide specific
         platform = lead_info.get("platform", "")
         
         # Validate email
-        if not validate_email(email):
-            state["messages"].append(AIMessage(
-                content="I need a valid email address. Could you please provide your email?"
-            ))
+        if not state["lead_flags"] & LEAD_FLAG_EMAIL_VALID:
+            self._add_ai_message(
+                state, "I need a valid email address. Could you please provide your email?"
+            )
             return state
         
         # Call mock lead capture
         result = mock_lead_capture(name, email, platform)
         
         # Add confirmation message
-        confirmation = f"Perfect! I've captured your information:\n- Name: {name}\n- Email: {email}\n- Platform: {platform}\n\nOur team will reach out to you shortly to help you get started with AutoStream!"
-        state["messages"].append(AIMessage(content=confirmation))
+        confirmation = CONFIRMATION_TEMPLATE.format(name=name, email=email, platform=platform)
+        self._add_ai_message(state, confirmation)
         
         return state
     
-    def _format_conversation_history(self, messages: List) -> str:
+    def _add_ai_message(self, state: AgentState, content: str):
+        """Append an agent reply to the messages and the history buffer."""
+        state["messages"].append(AIMessage(content=content))
+        state["history_buf"].append(f"Agent: {content}")
+    
+    def _format_conversation_history(self, state: AgentState) -> str:
         """Format conversation history for context."""
-        history_parts = []
-        for msg in messages[-6:]:  # Last 6 messages for context
-            if isinstance(msg, HumanMessage):
-                history_parts.append(f"User: {msg.content}")
-            elif isinstance(msg, AIMessage):
-                history_parts.append(f"Agent: {msg.content}")
-        return "\n".join(history_parts)
+        return "\n".join(state["history_buf"])
+    
+    def _new_state(self) -> AgentState:
+        """Create the state for a new conversation."""
+        return {
+            "messages": [],
+            "intent": "",
+            "lead_info": {},
+            "lead_flags": 0,
+            "conversation_turn": 0,
+            "history_buf": deque(maxlen=HISTORY_WINDOW),
+            "query_vector": None,
+            "context": None
+        }
+    
+    def _start_turn(self, user_message: str, state: AgentState = None) -> AgentState:
+        """Create the state for a new conversation if needed and add the user message."""
+        if state is None:
+            state = self._new_state()
+        
+        if "history_buf" not in state:
+            # Seed the buffer for states created by the caller
+            history_parts = []
+            for msg in state["messages"][-HISTORY_WINDOW:]:
+                if isinstance(msg, HumanMessage):
+                    history_parts.append(f"User: {msg.content}")
+                elif isinstance(msg, AIMessage):
+                    history_parts.append(f"Agent: {msg.content}")
+            state["history_buf"] = deque(history_parts, maxlen=HISTORY_WINDOW)
+        
+        if "lead_flags" not in state:
+            state.setdefault("lead_info", {})
+            state["lead_flags"] = self._lead_flags(state["lead_info"])
+        
+        # Add user message
+        state["messages"].append(HumanMessage(content=user_message))
+        return state
+    
+    def _last_response(self, final_state: AgentState) -> str:
+        """Get the content of the last AI message in the state."""
+        messages = final_state["messages"]
+        last_ai_message = None
+        for msg in reversed(messages):
+            if isinstance(msg, AIMessage):
+                last_ai_message = msg.content
+                break
+        
+        return last_ai_message or "I'm here to help!"
     
     def chat(self, user_message: str, state: AgentState = None) -> tuple[str, AgentState]:
         """
@@ -284,25 +662,145 @@ Answer questions clearly and concisely. If asked about pricing, provide specific
             Tuple of (agent_response, new_state)
         """
         if state is None:
-            state = {
-                "messages": [],
-                "intent": "",
-                "lead_info": {},
-                "conversation_turn": 0
-            }
+            state = self._new_state()
         
-        # Add user message
-        state["messages"].append(HumanMessage(content=user_message))
+        response = "".join(self.chat_stream(user_message, state))
+        return response, state
+    
+    def chat_stream(self, user_message: str, state: AgentState = None) -> Iterator[str]:
+        """
+        Process a user message and yield the agent response as it is generated.
+        
+        LLM answers are yielded token by token; canned and cached replies are
+        yielded whole. Once the stream is exhausted, `state` holds the new state.
+        
+        Args:
+            user_message: User's message
+            state: Current agent state (None for new conversation)
+            
+        Yields:
+            Chunks of the agent response
+        """
+        state = self._start_turn(user_message, state)
+        final_state = state
+        streamed = False
+        
+        # Run the graph, forwarding reply tokens and keeping the latest state
+        for mode, payload in self.app.stream(
+            state, config=self._run_config, stream_mode=["messages", "values"]
+        ):
+            if mode == "values":
+                final_state = payload
+                continue
+            chunk, metadata = payload
+            if (isinstance(chunk, AIMessageChunk) and chunk.content
+                    and metadata.get("langgraph_node") in STREAMED_NODES):
+                streamed = True
+                yield chunk.content
+        
+        if final_state is not state:
+            state.update(final_state)
+        if not streamed:
+            yield self._last_response(state)
+    
+    async def achat(
+        self, user_message: str, state: AgentState = None, prefetch: bool = True
+    ) -> tuple[str, AgentState]:
+        """
+        Async version of chat().
+        
+        Args:
+            user_message: User's message
+            state: Current agent state (None for new conversation)
+            prefetch: Speculatively answer likely follow-ups in the background
+            
+        Returns:
+            Tuple of (agent_response, new_state)
+        """
+        state = self._start_turn(user_message, state)
         
         # Run the graph
-        final_state = self.app.invoke(state)
+        final_state = await self.app.ainvoke(state, config=self._run_config)
         
-        # Get the last AI message
-        messages = final_state["messages"]
-        last_ai_message = None
-        for msg in reversed(messages):
-            if isinstance(msg, AIMessage):
-                last_ai_message = msg.content
-                break
+        if prefetch and final_state.get("query_vector") is not None and final_state["intent"] != "high_intent_lead":
+            task = asyncio.create_task(self._prefetch(final_state["query_vector"]))
+            self._prefetch_tasks.add(task)
+            task.add_done_callback(self._prefetch_tasks.discard)
+        
+        return self._last_response(final_state), final_state
+    
+    async def _prefetch(self, query_vector: np.ndarray):
+        """Answer the follow-ups closest to the current query into the response cache."""
+        loop = asyncio.get_running_loop()
+        if self._prefetch_loop is not loop:
+            self._prefetch_loop = loop
+            self._prefetch_semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+        
+        if self._followup_vectors is None:
+            try:
+                vectors = np.asarray(await self.embeddings.aembed_documents(FOLLOWUP_QUERIES), dtype=np.float32)
+            except Exception:
+                # Speculative work only; try again after the next turn
+                return
+            self._followup_vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+        # Rank follow-ups by similarity, skipping ones that restate the current query
+        scores = self._followup_vectors @ query_vector
+        ranked = [i for i in np.argsort(scores)[::-1] if scores[i] < self.response_cache.threshold]
+        
+        await asyncio.gather(*[
+            self._prefetch_answer(FOLLOWUP_QUERIES[i], self._followup_vectors[i])
+            for i in ranked[:PREFETCH_TOP_K]
+        ])
+    
+    async def _prefetch_answer(self, question: str, question_vector: np.ndarray):
+        """Answer a single follow-up question unless it is already cached."""
+        if self.faq_cache.lookup(question_vector) is not None:
+            return
+        if self.response_cache.lookup(question_vector) is not None:
+            return
+        
+        async with self._prefetch_semaphore:
+            try:
+                context = await self._aget_context(question, question_vector)
+                prompt = [
+                    SystemMessage(content=INQUIRY_SYSTEM_PROMPT.format(context=context)),
+                    HumanMessage(content=question)
+                ]
+                response = await self.llm.ainvoke(prompt)
+            except Exception:
+                # Speculative work only; the question is answered normally if asked
+                return
+        self.response_cache.add(question_vector, response.content)
+    
+    def chat_batch(self, user_messages: List[str]) -> List[tuple[str, AgentState]]:
+        """
+        Answer independent messages concurrently, each in a new conversation.
+        
+        Turns of the same conversation depend on each other and must go
+        through chat() in order.
+        
+        Args:
+            user_messages: User messages, one per conversation
+            
+        Returns:
+            List of (agent_response, new_state) tuples in input order
+        """
+        async def run_all():
+            return await asyncio.gather(*[
+                self.achat(message, prefetch=False) for message in user_messages
+            ])
         
-        return last_ai_message or "I'm here to help!", final_state
+        # Every batch runs on the same loop, so pooled async connections stay usable
+        return list(asyncio.run_coroutine_threadsafe(run_all(), self._get_batch_loop()).result())
+    
+    def _get_batch_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the agent's batch event loop in a daemon thread, or return the running one."""
+        with self._batch_loop_lock:
+            if self._batch_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=_run_loop, args=(loop,), name="agent-batch-loop", daemon=True).start()
+                # Stop the loop once the agent is garbage collected
+                weakref.finalize(self, loop.call_soon_threadsafe, loop.stop)
+                self._batch_loop = loop
+            return self._batch_loop
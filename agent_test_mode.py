@@ -2,11 +2,14 @@
 Test mode agent that works without OpenAI API calls.
 Uses mock responses to demonstrate the agent workflow.
 """
-import json
+import re
 from typing import TypedDict, Annotated, List
 from enum import Enum
+import orjson
 from langchain_core.messages import HumanMessage, AIMessage
 
+from lead_capture import EMAIL_RE
+
 
 class Intent(Enum):
     """User intent types."""
@@ -15,23 +18,51 @@ class Intent(Enum):
     HIGH_INTENT_LEAD = "high_intent_lead"
 
 
+# Keyword classes for MockIntentDetector, built once instead of per call.
+# Plain substring checks on the lowercased message beat a regex scan here.
+_LEAD_KEYWORDS = (
+    "name", "@",  # User is providing name/email
+    "want", "try", "sign up", "buy", "purchase", "interested", "ready",
+    "youtube", "instagram", "tiktok", "channel", "platform"
+)
+_GREETING_KEYWORDS = ("hi", "hello", "hey", "greetings")
+
+# Fallback lead extraction patterns used by TestModeAgent
+_NAME_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"(?:i'?m|my name is|i am|this is|call me)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)",
+    r"name[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)"
+))
+_PLATFORM_NAMES = {
+    name.lower(): name
+    for name in ('YouTube', 'Instagram', 'TikTok', 'Facebook', 'Twitter', 'LinkedIn', 'Twitch')
+}
+_PLATFORM_RE = re.compile(r'\b(' + '|'.join(_PLATFORM_NAMES) + r')\b', re.IGNORECASE)
+
+# Speaker labels for the message kind tags kept in AgentState["kinds"]
+_KIND_LABELS = {"U": "User", "A": "Agent"}
+
+
 class AgentState(TypedDict):
     """State management for the agent."""
     messages: List
     intent: str
     lead_info: dict
     conversation_turn: int
+    kinds: List[str]  # "U" or "A" for each entry of messages
 
 
 class MockRAGPipeline:
     """Mock RAG pipeline that returns hardcoded knowledge."""
     
     def __init__(self):
-        with open("knowledge_base.json", 'r', encoding='utf-8') as f:
-            self.kb_data = json.load(f)
+        with open("knowledge_base.json", 'rb') as f:
+            self.kb_data = orjson.loads(f.read())
+        
+        # The context does not depend on the query, so build it once
+        self._context = self._format_context()
     
-    def get_context(self, query: str) -> str:
-        """Return formatted knowledge base context."""
+    def _format_context(self) -> str:
+        """Format knowledge base data into a context string."""
         context_parts = []
         
         # Pricing
@@ -55,6 +86,10 @@ class MockRAGPipeline:
                     context_parts.append(f"Support: {policy_value}")
         
         return "\n".join(context_parts)
+    
+    def get_context(self, query: str) -> str:
+        """Return formatted knowledge base context."""
+        return self._context
 
 
 class MockIntentDetector:
@@ -62,24 +97,17 @@ class MockIntentDetector:
     
     def detect(self, message: str, conversation_history: str = "") -> Intent:
         """Detect intent from user message."""
-        message_lower = message.lower()
-        
         # Check if we're already collecting lead info (from conversation history)
-        if "lead_info" in conversation_history.lower() or "name" in message_lower or "@" in message_lower:
-            # If user is providing name/email, continue lead collection
+        if "lead_info" in conversation_history.lower():
             return Intent.HIGH_INTENT_LEAD
         
-        # High intent keywords
-        high_intent_keywords = ["want", "try", "sign up", "buy", "purchase", "interested", "ready"]
-        platform_keywords = ["youtube", "instagram", "tiktok", "channel", "platform"]
-        
-        if any(keyword in message_lower for keyword in high_intent_keywords) or \
-           any(keyword in message_lower for keyword in platform_keywords):
+        # Name/email details, high intent and platform keywords all mean a lead;
+        # greeting keywords only count for short messages
+        message_lower = message.lower()
+        if any(keyword in message_lower for keyword in _LEAD_KEYWORDS):
             return Intent.HIGH_INTENT_LEAD
         
-        # Greeting keywords
-        greeting_keywords = ["hi", "hello", "hey", "greetings"]
-        if any(keyword in message_lower for keyword in greeting_keywords) and len(message_lower.split()) < 5:
+        if any(keyword in message_lower for keyword in _GREETING_KEYWORDS) and len(message_lower.split()) < 5:
             return Intent.GREETING
         
         # Default to product inquiry
@@ -94,15 +122,11 @@ class TestModeAgent:
         self.intent_detector = MockIntentDetector()
         print("[INFO] Test mode agent initialized (no API calls required)")
     
-    def _format_conversation_history(self, messages: List) -> str:
-        """Format conversation history for context."""
-        history_parts = []
-        for msg in messages[-6:]:
-            if isinstance(msg, HumanMessage):
-                history_parts.append(f"User: {msg.content}")
-            elif isinstance(msg, AIMessage):
-                history_parts.append(f"Agent: {msg.content}")
-        return "\n".join(history_parts)
+    def _format_conversation_history(self, state: AgentState) -> str:
+        """Format conversation history (excluding the current message) for context."""
+        messages = state["messages"][-7:-1]
+        kinds = state["kinds"][-7:-1]
+        return "\n".join(f"{_KIND_LABELS[kind]}: {msg.content}" for kind, msg in zip(kinds, messages))
     
     def chat(self, user_message: str, state: AgentState = None) -> tuple[str, AgentState]:
         """Process a user message and return agent response."""
@@ -111,11 +135,17 @@ class TestModeAgent:
                 "messages": [],
                 "intent": "",
                 "lead_info": {},
-                "conversation_turn": 0
+                "conversation_turn": 0,
+                "kinds": []
             }
         
+        if "kinds" not in state:
+            # Tag messages of states created by the caller
+            state["kinds"] = ["U" if isinstance(msg, HumanMessage) else "A" for msg in state["messages"]]
+        
         # Add user message
         state["messages"].append(HumanMessage(content=user_message))
+        state["kinds"].append("U")
         
         # Check if we're already collecting lead info
         lead_info = state.get("lead_info", {})
@@ -126,7 +156,7 @@ class TestModeAgent:
         )
         
         # Detect intent
-        history = self._format_conversation_history(state["messages"][:-1])
+        history = self._format_conversation_history(state)
         
         # If we're collecting lead info, route to lead handler
         if is_collecting_lead:
@@ -196,21 +226,13 @@ Is there anything specific you'd like to know about AutoStream?"""
             from lead_capture import extract_info_from_message
             extracted = extract_info_from_message(user_message)
             
-            # Also check if user provided info directly in the message
-            user_lower = user_message.lower()
-            
             # Extract name
             if "name" in extracted and extracted["name"]:
                 lead_info["name"] = extracted["name"]
             elif "name" not in lead_info or not lead_info.get("name"):
                 # Try to extract name from patterns
-                import re
-                name_patterns = [
-                    r"(?:i'?m|my name is|i am|this is|call me)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)",
-                    r"name[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)"
-                ]
-                for pattern in name_patterns:
-                    name_match = re.search(pattern, user_message, re.IGNORECASE)
+                for pattern in _NAME_RES:
+                    name_match = pattern.search(user_message)
                     if name_match:
                         potential_name = name_match.group(1).strip()
                         # Basic validation: name shouldn't be too long or contain email-like patterns
@@ -222,8 +244,7 @@ Is there anything specific you'd like to know about AutoStream?"""
             if "email" in extracted and "email" not in lead_info:
                 lead_info["email"] = extracted["email"]
             elif "email" not in lead_info:
-                import re
-                email_match = re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', user_message)
+                email_match = EMAIL_RE.search(user_message)
                 if email_match:
                     lead_info["email"] = email_match.group()
             
@@ -231,11 +252,9 @@ Is there anything specific you'd like to know about AutoStream?"""
             if "platform" in extracted and "platform" not in lead_info:
                 lead_info["platform"] = extracted["platform"]
             elif "platform" not in lead_info:
-                platforms = ['YouTube', 'Instagram', 'TikTok', 'Facebook', 'Twitter', 'LinkedIn', 'Twitch']
-                for platform in platforms:
-                    if platform.lower() in user_lower:
-                        lead_info["platform"] = platform
-                        break
+                platform_match = _PLATFORM_RE.search(user_message)
+                if platform_match:
+                    lead_info["platform"] = _PLATFORM_NAMES[platform_match.group(1).lower()]
             
             # Check what's missing
             missing = []
@@ -282,6 +301,7 @@ Is there anything specific you'd like to know about AutoStream?"""
         
         # Add AI response to state
         state["messages"].append(AIMessage(content=response))
+        state["kinds"].append("A")
         
         return response, state
 
@@ -3,9 +3,33 @@ Demo script showcasing the agent's capabilities.
 This script runs through a complete conversation flow.
 """
 import os
+import sys
 from agent import ConversationalAgent
 
-def run_demo():
+
+# Independent questions, each answered in its own conversation
+EVAL_MESSAGES = [
+    "Tell me about your pricing.",
+    "What's included in the Pro plan?",
+    "What's your refund policy?",
+    "Do you offer 24/7 support?",
+    "What resolution does the Basic plan support?"
+]
+
+def run_eval(agent: ConversationalAgent):
+    """Answer the evaluation questions concurrently."""
+    print("Running evaluation questions...\n")
+    print("-" * 70)
+    
+    results = agent.chat_batch(EVAL_MESSAGES)
+    for i, (user_msg, (response, state)) in enumerate(zip(EVAL_MESSAGES, results), 1):
+        print(f"\n[Question {i}] User: {user_msg}")
+        print("-" * 70)
+        print(f"Agent: {response}")
+        print(f"\n[State] Intent: {state.get('intent', 'N/A')}")
+        print("-" * 70)
+
+def run_demo(eval_mode: bool = False):
     """Run a demonstration of the agent."""
     print("=" * 70)
     print("AutoStream Conversational AI Agent - Demo")
@@ -43,6 +67,10 @@ def run_demo():
         
         return
     
+    if eval_mode:
+        run_eval(agent)
+        return
+    
     # Initialize state
     state = {
         "messages": [],
@@ -81,4 +109,4 @@ def run_demo():
     print("=" * 70)
 
 if __name__ == "__main__":
-    run_demo()
+    run_demo(eval_mode="--eval" in sys.argv[1:])
@@ -1,10 +1,24 @@
 """
 Intent detection system for classifying user messages.
 """
+import json
+import re
 from enum import Enum
-from typing import Dict
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from typing import Dict, Optional
+
+from lead_capture import EMAIL_RE
+
+# Kept free of per-call content so every request shares the same cacheable prefix
+INTENT_SYSTEM_PROMPT = """You are an intent classification system for AutoStream, a SaaS video editing platform.
+
+Classify the user's message into one of these intents:
+1. "greeting" - Casual greetings, hello, hi, etc.
+2. "product_inquiry" - Questions about pricing, features, plans, policies
+3. "high_intent_lead" - User shows clear interest in signing up, wants to try/buy, mentions their platform/channel, ready to proceed
+
+Consider the conversation history to understand context. A user asking about pricing is "product_inquiry", but if they say "I want to try/sign up/buy" or mention their platform, classify as "high_intent_lead".
+
+Respond with ONLY a JSON object of the form {"intent": "<label>"}, where <label> is greeting, product_inquiry, or high_intent_lead"""
 
 
 class Intent(Enum):
@@ -14,6 +28,33 @@ class Intent(Enum):
     HIGH_INTENT_LEAD = "high_intent_lead"
 
 
+# Intents are passed around as their plain string values; the Enum declares them
+_INTENT_VALUES = frozenset(intent.value for intent in Intent)
+
+# Messages that are nothing but a greeting; "Hi, what does it cost?" still needs classifying
+_GREETING_RE = re.compile(r"^\s*(?:hi|hello|hey|yo|greetings)(?:\s+there)?[\s!.,]*$", re.IGNORECASE)
+_LEAD_RE = re.compile(
+    r"\b(?:sign(?:ing)?[\s-]?up|try|buy|subscribe|my (?:youtube|channel|instagram))\b", re.IGNORECASE
+)
+
+
+def classify_by_rules(message: str) -> Optional[str]:
+    """
+    Classify messages whose intent is unambiguous without a model call.
+    
+    Args:
+        message: Current user message
+        
+    Returns:
+        Detected intent value, or None if the message needs a model to classify
+    """
+    if _GREETING_RE.match(message):
+        return Intent.GREETING.value
+    if EMAIL_RE.search(message) or _LEAD_RE.search(message):
+        return Intent.HIGH_INTENT_LEAD.value
+    return None
+
+
 class IntentDetector:
     """Detects user intent from conversation messages."""
     
@@ -25,55 +66,72 @@ class IntentDetector:
             api_key: OpenAI API key (if None, uses environment variable)
             model: LLM model to use
         """
+        # LangChain is imported here so classify_by_rules() and Intent stay cheap to import
+        from langchain_core.messages import SystemMessage
+        from langchain_core.prompts import ChatPromptTemplate
+        from openai_clients import get_chat_model
+        
         # Ensure API key is available - use environment variable if not provided
         if api_key is None:
             import os
             api_key = os.getenv("OPENAI_API_KEY")
         
-        self.llm = ChatOpenAI(
-            model=model,
-            temperature=0,
-            api_key=api_key
-        )
+        self.llm = get_chat_model(api_key, model, 0)
+        # JSON mode keeps the reply to a single parseable object
+        self._json_llm = self.llm.bind(response_format={"type": "json_object"})
         
+        # Static instructions first, then the per-call history and message
         self.prompt_template = ChatPromptTemplate.from_messages([
-            ("system", """You are an intent classification system for AutoStream, a SaaS video editing platform.
-
-Classify the user's message into one of these intents:
-1. "greeting" - Casual greetings, hello, hi, etc.
-2. "product_inquiry" - Questions about pricing, features, plans, policies
-3. "high_intent_lead" - User shows clear interest in signing up, wants to try/buy, mentions their platform/channel, ready to proceed
-
-Consider the conversation history to understand context. A user asking about pricing is "product_inquiry", but if they say "I want to try/sign up/buy" or mention their platform, classify as "high_intent_lead".
-
-Respond with ONLY the intent name: greeting, product_inquiry, or high_intent_lead"""),
-            ("human", "Conversation history:\n{history}\n\nUser message: {message}\n\nIntent:")
+            SystemMessage(content=INTENT_SYSTEM_PROMPT),
+            ("human", "Conversation history:\n{history}"),
+            ("human", "User message: {message}\n\nIntent:")
         ])
     
-    def detect(self, message: str, conversation_history: str = "") -> Intent:
+    def detect(self, message: str, conversation_history: str = "") -> str:
         """
-        Detect intent from user message.
+        Detect intent from user message with the LLM.
+        
+        Callers try classify_by_rules() first; this is only reached when it returns None.
         
         Args:
             message: Current user message
             conversation_history: Previous conversation context
             
         Returns:
-            Detected Intent enum
+            Detected intent value (one of the Intent values)
+        """
+        response = self._json_llm.invoke(self._format_prompt(message, conversation_history))
+        return self._parse_intent(response.content)
+    
+    async def adetect(self, message: str, conversation_history: str = "") -> str:
         """
-        prompt = self.prompt_template.format_messages(
+        Async version of detect().
+        
+        Args:
+            message: Current user message
+            conversation_history: Previous conversation context
+            
+        Returns:
+            Detected intent value (one of the Intent values)
+        """
+        response = await self._json_llm.ainvoke(self._format_prompt(message, conversation_history))
+        return self._parse_intent(response.content)
+    
+    def _format_prompt(self, message: str, conversation_history: str) -> list:
+        """Build the classification prompt messages."""
+        return self.prompt_template.format_messages(
             history=conversation_history or "No previous conversation.",
             message=message
         )
-        
-        response = self.llm.invoke(prompt)
-        intent_str = response.content.strip().lower()
-        
-        # Map string to enum
-        intent_map = {
-            "greeting": Intent.GREETING,
-            "product_inquiry": Intent.PRODUCT_INQUIRY,
-            "high_intent_lead": Intent.HIGH_INTENT_LEAD
-        }
-        
-        return intent_map.get(intent_str, Intent.PRODUCT_INQUIRY)
+    
+    @staticmethod
+    def _parse_intent(content: str) -> str:
+        """Extract the intent value from the JSON reply of the classifier."""
+        # Malformed replies and unknown labels fall back to an inquiry
+        try:
+            intent_str = str(json.loads(content)["intent"]).strip().lower()
+        except (ValueError, KeyError, TypeError):
+            return Intent.PRODUCT_INQUIRY.value
+        if intent_str in _INTENT_VALUES:
+            return intent_str
+        return Intent.PRODUCT_INQUIRY.value
@@ -1,8 +1,35 @@
 """
 Lead capture tool for collecting user information.
 """
+import re
 from typing import Dict
 
+# Patterns are compiled once at import instead of on every message
+_VALIDATE_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# Also used by the intent rules, so routing and extraction agree on what an email is
+EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_NAME_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"(?:i'?m|i am|my name is|this is|call me|it'?s)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)",
+    r"name[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)",
+    r"^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)(?:\s|$)",  # Name at start of message
+    r"([A-Z][a-z]+\s+[A-Z][a-z]+)",  # Two capitalized words (likely first + last name)
+])
+
+# Platform keywords mapped to their canonical names
+_PLATFORM_MAP = {
+    'youtube': 'YouTube',
+    'instagram': 'Instagram',
+    'tiktok': 'TikTok',
+    'facebook': 'Facebook',
+    'twitter': 'Twitter',
+    'x': 'Twitter',  # X (formerly Twitter)
+    'linkedin': 'LinkedIn',
+    'twitch': 'Twitch',
+    'vimeo': 'Vimeo',
+    'snapchat': 'Snapchat'
+}
+_PLATFORM_RE = re.compile(r'\b(' + '|'.join(map(re.escape, _PLATFORM_MAP)) + r')\b', re.IGNORECASE)
+
 
 def mock_lead_capture(name: str, email: str, platform: str) -> Dict[str, str]:
     """
@@ -36,9 +63,7 @@ def validate_email(email: str) -> bool:
     Returns:
         True if email format is valid
     """
-    import re
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_VALIDATE_EMAIL_RE.match(email))
 
 
 def extract_info_from_message(message: str) -> Dict[str, str]:
@@ -51,44 +76,21 @@ def extract_info_from_message(message: str) -> Dict[str, str]:
     Returns:
         Dictionary with extracted info (name, email, platform)
     """
-    import re
-    
     extracted = {}
     
     # Extract email (most reliable)
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    email_match = re.search(email_pattern, message)
+    email_match = EMAIL_RE.search(message)
     if email_match:
         extracted['email'] = email_match.group()
     
-    # Extract platform (common platforms) - check for variations
-    platforms = {
-        'youtube': 'YouTube',
-        'instagram': 'Instagram',
-        'tiktok': 'TikTok',
-        'facebook': 'Facebook',
-        'twitter': 'Twitter',
-        'x': 'Twitter',  # X (formerly Twitter)
-        'linkedin': 'LinkedIn',
-        'twitch': 'Twitch',
-        'vimeo': 'Vimeo',
-        'snapchat': 'Snapchat'
-    }
-    message_lower = message.lower()
-    for platform_key, platform_name in platforms.items():
-        if platform_key in message_lower:
-            extracted['platform'] = platform_name
-            break
+    # Extract platform (common platforms) in a single scan of the message
+    platform_match = _PLATFORM_RE.search(message)
+    if platform_match:
+        extracted['platform'] = _PLATFORM_MAP[platform_match.group(1).lower()]
     
     # Try to extract name (look for various patterns)
-    name_patterns = [
-        r"(?:i'?m|i am|my name is|this is|call me|it'?s)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)",
-        r"name[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)",
-        r"^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)(?:\s|$)",  # Name at start of message
-        r"([A-Z][a-z]+\s+[A-Z][a-z]+)",  # Two capitalized words (likely first + last name)
-    ]
-    for pattern in name_patterns:
-        name_match = re.search(pattern, message, re.IGNORECASE)
+    for pattern in _NAME_PATTERNS:
+        name_match = pattern.search(message)
         if name_match:
             potential_name = name_match.group(1).strip()
             # Basic validation: name shouldn't be too long or contain email-like patterns
@@ -0,0 +1,82 @@
+"""
+Shared HTTP clients and model wrappers for the OpenAI chat and embedding models.
+"""
+import asyncio
+import importlib.util
+import weakref
+from functools import cache
+
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+# HTTP/2 lets concurrent requests share one connection; it needs the optional h2 package
+_HTTP2 = importlib.util.find_spec("h2") is not None
+_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=16)
+
+
+
+class _PerLoopTransport(httpx.AsyncBaseTransport):
+    """Async transport that keeps a separate connection pool for each event loop."""
+    
+    def __init__(self):
+        # Pooled connections belong to the loop that opened them; a pool goes away with its loop
+        self._transports = weakref.WeakKeyDictionary()
+    
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = self._transports[loop] = httpx.AsyncHTTPTransport(http2=_HTTP2, limits=_LIMITS)
+        return transport
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+    
+    async def aclose(self):
+        await self._transport().aclose()
+
+
+# One keep-alive pool for every model client (one per event loop for async calls),
+# so only the first request pays the TLS handshake
+http_client = httpx.Client(http2=_HTTP2, limits=_LIMITS)
+http_async_client = httpx.AsyncClient(transport=_PerLoopTransport())
+
+
+@cache
+def get_chat_model(api_key: str, model: str, temperature: float) -> ChatOpenAI:
+    """
+    Get the process-wide chat model for these settings, creating it on first use.
+    
+    Args:
+        api_key: OpenAI API key
+        model: LLM model to use
+        temperature: Sampling temperature
+        
+    Returns:
+        Shared ChatOpenAI instance
+    """
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        api_key=api_key,
+        http_client=http_client,
+        http_async_client=http_async_client
+    )
+
+
+@cache
+def get_embeddings(api_key: str) -> OpenAIEmbeddings:
+    """
+    Get the process-wide embeddings client for an API key, creating it on first use.
+    
+    Args:
+        api_key: OpenAI API key (if None, the client uses the environment variable)
+        
+    Returns:
+        Shared OpenAIEmbeddings instance
+    """
+    return OpenAIEmbeddings(
+        api_key=api_key,
+        http_client=http_client,
+        http_async_client=http_async_client
+    )
@@ -1,13 +1,43 @@
 """
 RAG Pipeline for knowledge retrieval from local knowledge base.
 """
-import json
-from typing import List, Dict
+import asyncio
+import hashlib
+import io
+import os
+from typing import List, Dict, Optional, Tuple
+import faiss
+import numpy as np
+import orjson
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from openai_clients import get_embeddings
+
+# Built indexes are saved under a subdirectory named after the knowledge base digest
+RAG_CACHE_DIR = ".rag_cache"
+FAQ_CACHE_FILE = "faq_{version}.json"
+
+# Part of the cache digest; bump when the index layout changes so stale indexes are rebuilt
+INDEX_VERSION = "ip-normalized-v1"
+
+# Part of the FAQ cache file name; bump when faq_entries() changes so stale answers are rebuilt
+FAQ_VERSION = "v1"
+
+# Chunks scoring below this cosine similarity are dropped from the context (the best chunk is always kept)
+MIN_RETRIEVAL_SCORE = 0.3
+
+# Chunks sent per embeddings request when building the index
+EMBED_BATCH_SIZE = 256
+
+# The splitter is stateless, so one instance serves every pipeline
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=200
+)
+
 
 class RAGPipeline:
     """RAG pipeline for retrieving information from knowledge base."""
@@ -24,54 +54,124 @@ class RAGPipeline:
         
         # Ensure API key is available - use environment variable if not provided
         if api_key is None:
-            import os
             api_key = os.getenv("OPENAI_API_KEY")
         
-        self.embeddings = OpenAIEmbeddings(api_key=api_key)
+        self.embeddings = get_embeddings(api_key)
         self.vectorstore = None
-        self._load_and_index_knowledge_base()
+        self.cache_dir = os.path.join(RAG_CACHE_DIR, self._knowledge_base_digest())
+        
+        # Reuse the index built by a previous run instead of re-embedding every chunk
+        if os.path.exists(os.path.join(self.cache_dir, "index.faiss")):
+            self.vectorstore = FAISS.load_local(
+                self.cache_dir,
+                self.embeddings,
+                allow_dangerous_deserialization=True,
+                distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+            )
+        else:
+            self._load_and_index_knowledge_base()
+            self.vectorstore.save_local(self.cache_dir)
+    
+    def _knowledge_base_digest(self) -> str:
+        """Hash the knowledge base file and embedding model that the index is built from."""
+        try:
+            with open(self.knowledge_base_path, 'rb') as f:
+                digest = hashlib.sha256(f.read())
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Knowledge base file not found: {self.knowledge_base_path}")
+        digest.update(self.embeddings.model.encode())
+        digest.update(INDEX_VERSION.encode())
+        return digest.hexdigest()
     
     def _load_knowledge_base(self) -> Dict:
         """Load knowledge base from JSON file."""
         try:
-            with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(self.knowledge_base_path, 'rb') as f:
+                return orjson.loads(f.read())
         except FileNotFoundError:
             raise FileNotFoundError(f"Knowledge base file not found: {self.knowledge_base_path}")
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in knowledge base: {e}")
     
     def _format_knowledge_base(self, kb_data: Dict) -> str:
         """Format knowledge base data into searchable text."""
-        text_parts = []
+        buf = io.StringIO()
+        write = buf.write
         
         # Company info
         if "company_info" in kb_data:
             info = kb_data["company_info"]
-            text_parts.append(f"Company: {info.get('name', 'AutoStream')}")
-            text_parts.append(f"Description: {info.get('description', '')}")
+            write(f"Company: {info.get('name', 'AutoStream')}\n"
+                  f"Description: {info.get('description', '')}\n")
         
         # Pricing plans
         if "pricing" in kb_data:
-            text_parts.append("\n## Pricing Plans\n")
-            for plan_key, plan_data in kb_data["pricing"].items():
-                text_parts.append(f"\n{plan_data['name']}:")
-                text_parts.append(f"  Price: {plan_data['price']}")
-                text_parts.append(f"  Videos per month: {plan_data['videos_per_month']}")
-                text_parts.append(f"  Resolution: {plan_data['resolution']}")
+            write("\n## Pricing Plans\n\n")
+            for plan_data in kb_data["pricing"].values():
+                write(f"\n{plan_data['name']}:\n"
+                      f"  Price: {plan_data['price']}\n"
+                      f"  Videos per month: {plan_data['videos_per_month']}\n"
+                      f"  Resolution: {plan_data['resolution']}\n")
                 if "features" in plan_data:
-                    text_parts.append(f"  Features: {', '.join(plan_data['features'])}")
+                    write(f"  Features: {', '.join(plan_data['features'])}\n")
         
         # Policies
         if "policies" in kb_data:
-            text_parts.append("\n## Company Policies\n")
+            write("\n## Company Policies\n\n")
             for policy_key, policy_value in kb_data["policies"].items():
                 if policy_key == "refund_policy":
-                    text_parts.append(f"Refund Policy: {policy_value}")
+                    write(f"Refund Policy: {policy_value}\n")
                 elif policy_key == "support":
-                    text_parts.append(f"Support: {policy_value}")
+                    write(f"Support: {policy_value}\n")
         
-        return "\n".join(text_parts)
+        # Each part above ends in a newline; the text itself does not
+        return buf.getvalue().removesuffix("\n")
+    
+    def faq_entries(self) -> List[Tuple[str, str]]:
+        """
+        Build canned answers for the most common questions about the knowledge base.
+        
+        Returns:
+            List of (question, answer) pairs
+        """
+        faq_path = os.path.join(self.cache_dir, FAQ_CACHE_FILE.format(version=FAQ_VERSION))
+        if os.path.exists(faq_path):
+            with open(faq_path, 'rb') as f:
+                return [tuple(entry) for entry in orjson.loads(f.read())]
+        
+        kb_data = self._load_knowledge_base()
+        entries = []
+        
+        # Pricing plans
+        if "pricing" in kb_data:
+            plans = kb_data["pricing"].values()
+            overview = [f"We offer {len(plans)} pricing plans:"]
+            for plan_data in plans:
+                overview.append(f"\n**{plan_data['name']}:**")
+                overview.append(f"- Price: {plan_data['price']}")
+                overview.extend(f"- {feature}" for feature in plan_data.get("features", []))
+            overview_text = "\n".join(overview)
+            entries.append(("What are your pricing plans?", overview_text))
+            entries.append(("How much does AutoStream cost?", overview_text))
+            
+            for plan_data in plans:
+                features = "\n".join(f"- {feature}" for feature in plan_data.get("features", []))
+                entries.append((
+                    f"What's included in the {plan_data['name']}?",
+                    f"The {plan_data['name']} ({plan_data['price']}) includes:\n{features}"
+                ))
+        
+        # Policies
+        policies = kb_data.get("policies", {})
+        if "refund_policy" in policies:
+            entries.append(("What is your refund policy?", f"Our refund policy: {policies['refund_policy']}."))
+        if "support" in policies:
+            entries.append(("Do you offer customer support?", f"Support: {policies['support']}."))
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(faq_path, 'wb') as f:
+            f.write(orjson.dumps(entries))
+        return entries
     
     def _load_and_index_knowledge_base(self):
         """Load knowledge base and create vector store."""
@@ -82,22 +182,51 @@ class RAGPipeline:
         documents = [Document(page_content=formatted_text, metadata={"source": "knowledge_base"})]
         
         # Split documents
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
+        split_docs = _SPLITTER.split_documents(documents)
+        
+        # Embed the chunks in explicit batches, then build the vector store from the vectors
+        texts = [doc.page_content for doc in split_docs]
+        vectors = np.asarray(
+            self.embeddings.embed_documents(texts, chunk_size=EMBED_BATCH_SIZE), dtype=np.float32
         )
-        split_docs = text_splitter.split_documents(documents)
         
-        # Create vector store
-        self.vectorstore = FAISS.from_documents(split_docs, self.embeddings)
+        # Unit vectors in an inner-product index, so scores are cosine similarities
+        faiss.normalize_L2(vectors)
+        self.vectorstore = FAISS.from_embeddings(
+            text_embeddings=list(zip(texts, vectors.tolist())),
+            embedding=self.embeddings,
+            metadatas=[doc.metadata for doc in split_docs],
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
     
-    def retrieve(self, query: str, k: int = 3) -> List[str]:
+    def retrieve(self, query: str, k: int = 3, query_vector: Optional[List[float]] = None) -> List[str]:
         """
         Retrieve relevant information from knowledge base.
         
         Args:
             query: User query
             k: Number of documents to retrieve
+            query_vector: Precomputed embedding of the query (skips embedding it again)
+            
+        Returns:
+            List of relevant text chunks
+        """
+        if self.vectorstore is None:
+            return ["Knowledge base not loaded."]
+        
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        vector = np.array([query_vector], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return self.retrieve_by_vector(vector[0], k=k)
+    
+    def retrieve_by_vector(self, vector: np.ndarray, k: int = 3) -> List[str]:
+        """
+        Retrieve relevant information for an already normalized query embedding.
+        
+        Args:
+            vector: Unit-length float32 embedding of the query
+            k: Number of documents to retrieve
             
         Returns:
             List of relevant text chunks
@@ -105,18 +234,39 @@ class RAGPipeline:
         if self.vectorstore is None:
             return ["Knowledge base not loaded."]
         
-        docs = self.vectorstore.similarity_search(query, k=k)
-        return [doc.page_content for doc in docs]
+        docs_and_scores = self.vectorstore.similarity_search_with_score_by_vector(vector, k=k)
+        return [
+            doc.page_content for i, (doc, score) in enumerate(docs_and_scores)
+            if i == 0 or score >= MIN_RETRIEVAL_SCORE
+        ]
     
-    def get_context(self, query: str) -> str:
+    def get_context(self, query: str, query_vector: Optional[np.ndarray] = None) -> str:
         """
         Get formatted context for the query.
         
         Args:
             query: User query
+            query_vector: Precomputed unit-length embedding of the query (skips embedding it again)
+            
+        Returns:
+            Formatted context string
+        """
+        if query_vector is None:
+            retrieved_docs = self.retrieve(query)
+        else:
+            retrieved_docs = self.retrieve_by_vector(query_vector)
+        # Overlapping splits of a small knowledge base can return the same chunk more than once
+        return "\n\n".join(dict.fromkeys(retrieved_docs))
+    
+    async def aget_context(self, query: str, query_vector: Optional[np.ndarray] = None) -> str:
+        """
+        Async version of get_context(), run in a worker thread.
+        
+        Args:
+            query: User query
+            query_vector: Precomputed unit-length embedding of the query (skips embedding it again)
             
         Returns:
             Formatted context string
         """
-        retrieved_docs = self.retrieve(query)
-        return "\n\n".join(retrieved_docs)
+        return await asyncio.to_thread(self.get_context, query, query_vector)
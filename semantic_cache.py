@@ -0,0 +1,277 @@
+"""
+Semantic cache for reusing responses to semantically similar queries.
+"""
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numba import njit
+
+
+@njit(fastmath=True, cache=True)
+def _best_match_kernel(
+    matrix: np.ndarray, scales: np.ndarray, query: np.ndarray, query_scale: float
+) -> Tuple[int, float]:
+    """
+    Find the row of the int8 `matrix` with the largest dot product with the int8 `query`.
+
+    Dot products are accumulated in int32 and rescaled by the per-row and
+    query scales. The scan keeps a running best, so no score array is
+    allocated. It is serial on purpose: the caches are searched from several
+    threads at once, which Numba's default parallel layer does not allow.
+    """
+    n, d = matrix.shape
+    best_index = -1
+    best_score = np.float32(-np.inf)
+    for i in range(n):
+        acc = np.int32(0)
+        for j in range(d):
+            acc += np.int32(matrix[i, j]) * np.int32(query[j])
+        score = np.float32(acc) * scales[i] * query_scale
+        if score > best_score:
+            best_score = score
+            best_index = i
+    return best_index, best_score
+
+
+def _best_match(
+    matrix: np.ndarray, scales: np.ndarray, query: np.ndarray, query_scale: float
+) -> Tuple[int, float]:
+    """Index and cosine score of the quantized row most similar to a quantized query."""
+    return _best_match_kernel(matrix, scales, query, np.float32(query_scale))
+
+
+def _quantize(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Quantize a unit vector to int8 with a symmetric per-vector scale."""
+    peak = float(np.max(np.abs(vector)))
+    scale = peak / 127 if peak else 1.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+
+def normalize(vector) -> np.ndarray:
+    """Convert an embedding to a float32 unit vector."""
+    vec = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+# Compile at import so the first real lookup does not pay the JIT cost
+_best_match(np.ones((1, 1), dtype=np.int8), np.ones(1, dtype=np.float32), np.ones(1, dtype=np.int8), 1.0)
+
+
+class SemanticCache:
+    """
+    In-memory cache mapping query embeddings to previously generated responses.
+
+    Vectors are stored as int8 with one float32 scale each, a quarter of the
+    memory of float32 embeddings. Small caches are searched exhaustively.
+    Once the cache outgrows `exact_search_limit`, lookups only score the
+    entries that share a random-projection LSH bucket with the query in at
+    least one table.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        batch_size: int = 32,
+        exact_search_limit: int = 256,
+        num_tables: int = 10,
+        num_bits: int = 12,
+        seed: int = 0,
+        prenormalized: bool = False
+    ):
+        """
+        Initialize semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a cached entry to count as a hit
+            batch_size: Number of new vectors buffered before they are stacked into the matrix
+            exact_search_limit: Cache size up to which every entry is scored
+            num_tables: Number of LSH hash tables
+            num_bits: Hyperplanes (sign bits) per LSH table
+            seed: Seed for the random projections
+            prenormalized: Callers pass float32 unit vectors, so they are used as-is
+        """
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.exact_search_limit = exact_search_limit
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        self.seed = seed
+        self.prenormalized = prenormalized
+        self._matrix: Optional[np.ndarray] = None  # Contiguous int8 matrix of quantized unit vectors
+        self._scales: Optional[np.ndarray] = None  # float32 dequantization scale of each matrix row
+        self._pending: List[np.ndarray] = []  # Quantized vectors not yet stacked into the matrix
+        self._pending_scales: List[float] = []
+        self._responses: List[str] = []
+        self._projections: Optional[np.ndarray] = None  # Built lazily once the dimension is known
+        self._bit_weights = np.left_shift(np.uint64(1), np.arange(num_bits, dtype=np.uint64))
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(num_tables)]
+        self._lock = threading.Lock()  # Graph nodes may run concurrently in worker threads
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def _normalize(self, vector) -> np.ndarray:
+        """Convert an embedding to a float32 unit vector, unless it already is one."""
+        return vector if self.prenormalized else normalize(vector)
+
+    def _bucket_keys(self, vector: np.ndarray) -> List[int]:
+        """Hash a unit vector to one bucket key per LSH table."""
+        if self._projections is None:
+            rng = np.random.default_rng(self.seed)
+            self._projections = rng.standard_normal(
+                (self.num_tables * self.num_bits, vector.shape[0])
+            ).astype(np.float32)
+        bits = (self._projections @ vector > 0).reshape(self.num_tables, self.num_bits)
+        return [int(key) for key in bits.astype(np.uint64) @ self._bit_weights]
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        """Indices of entries sharing at least one LSH bucket with the query."""
+        candidates = set()
+        for table, key in zip(self._buckets, self._bucket_keys(query)):
+            candidates.update(table.get(key, ()))
+        return np.fromiter(sorted(candidates), dtype=np.int64, count=len(candidates))
+
+    def _flush(self):
+        """Stack pending vectors into the contiguous similarity matrix."""
+        if not self._pending:
+            return
+        scales = np.asarray(self._pending_scales, dtype=np.float32)
+        if self._matrix is None:
+            self._matrix = np.vstack(self._pending)
+            self._scales = scales
+        else:
+            self._matrix = np.vstack([self._matrix] + self._pending)
+            self._scales = np.concatenate([self._scales, scales])
+        self._pending = []
+        self._pending_scales = []
+
+    def lookup(self, vector) -> Optional[str]:
+        """
+        Find a cached response for a semantically similar query.
+
+        Args:
+            vector: Query embedding
+
+        Returns:
+            Cached response if the best match reaches the threshold, otherwise None
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            return self._lookup(query)
+
+    def _lookup(self, query: np.ndarray) -> Optional[str]:
+        """Find the best cached entry for a unit query vector."""
+        if not self._responses:
+            return None
+        if len(self._responses) > self.exact_search_limit:
+            return self._lookup_candidates(query)
+
+        blocks = [(self._matrix, self._scales)] if self._matrix is not None else []
+        if self._pending:
+            blocks.append((np.vstack(self._pending), np.asarray(self._pending_scales, dtype=np.float32)))
+
+        best_index, best_score = self._best_of(blocks, query)
+        if best_score >= self.threshold:
+            return self._responses[best_index]
+        return None
+
+    @staticmethod
+    def _best_of(blocks: List[Tuple[np.ndarray, np.ndarray]], query: np.ndarray) -> Tuple[int, float]:
+        """Best match over (rows, scales) blocks, indexed as if the blocks were concatenated."""
+        query_rows, query_scale = _quantize(query)
+        best_index, best_score, offset = -1, -1.0, 0
+        for rows, scales in blocks:
+            index, score = _best_match(rows, scales, query_rows, query_scale)
+            if score > best_score:
+                best_index, best_score = offset + int(index), float(score)
+            offset += rows.shape[0]
+        return best_index, best_score
+
+    def _lookup_candidates(self, query: np.ndarray) -> Optional[str]:
+        """Score only the LSH candidates of the query."""
+        candidates = self._candidates(query)
+        if candidates.size == 0:
+            return None
+
+        stacked = 0 if self._matrix is None else self._matrix.shape[0]
+        split = int(np.searchsorted(candidates, stacked))
+        blocks = []
+        if split:
+            blocks.append((self._matrix[candidates[:split]], self._scales[candidates[:split]]))
+        if split < candidates.size:
+            pending = candidates[split:] - stacked
+            blocks.append((
+                np.vstack([self._pending[i] for i in pending]),
+                np.asarray([self._pending_scales[i] for i in pending], dtype=np.float32)
+            ))
+
+        index, score = self._best_of(blocks, query)
+        if score >= self.threshold:
+            return self._responses[int(candidates[index])]
+        return None
+
+    def add(self, vector, response: str):
+        """
+        Store a response under its query embedding.
+
+        Args:
+            vector: Query embedding
+            response: Response text to reuse on future hits
+        """
+        vec = self._normalize(vector)
+        with self._lock:
+            index = len(self._responses)
+            for table, key in zip(self._buckets, self._bucket_keys(vec)):
+                table.setdefault(key, []).append(index)
+            rows, scale = _quantize(vec)
+            self._pending.append(rows)
+            self._pending_scales.append(scale)
+            self._responses.append(response)
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def save(self, path: str, max_entries: Optional[int] = None):
+        """
+        Write the cached vectors and responses to an .npz file.
+
+        Args:
+            path: Destination file path
+            max_entries: Keep only this many of the most recently added entries
+        """
+        with self._lock:
+            self._flush()
+            if self._matrix is None:
+                return
+            start = 0 if max_entries is None else max(0, len(self._responses) - max_entries)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    matrix=self._matrix[start:],
+                    scales=self._scales[start:],
+                    responses=np.array(self._responses[start:])
+                )
+            os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        """
+        Add the entries of a file written by `save` to the cache.
+
+        Args:
+            path: Path of the saved cache
+        """
+        with np.load(path) as data:
+            matrix, scales, responses = data["matrix"], data["scales"], data["responses"]
+        with self._lock:
+            for rows, scale, response in zip(matrix, scales, responses):
+                index = len(self._responses)
+                vec = normalize(rows * scale)
+                for table, key in zip(self._buckets, self._bucket_keys(vec)):
+                    table.setdefault(key, []).append(index)
+                self._pending.append(rows)
+                self._pending_scales.append(float(scale))
+                self._responses.append(str(response))
+            self._flush()